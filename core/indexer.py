@@ -626,7 +626,7 @@ class Indexer:
 
         return docs
 
-    def _index_file(self, filename: str, uri: str, metadata: Dict[str, Any], id: str = None) -> bool:
+    def _index_file(self, filename: str, uri: str, metadata: Dict[str, Any], id: str = None, content: bytes = None) -> bool:
         """
         Index a file on local file system by uploading it to the Vectara corpus, using APIv2
         Args:
@@ -634,13 +634,17 @@ class Indexer:
             uri (str): URI for where the document originated. In some cases the local file name is not the same, and we want to include this in the index.
             metadata (dict): Metadata for the document.
             id (str, optional): Document id for the uploaded document.
+            content (bytes, optional): Content of the file. If provided, it is uploaded instead of reading filename from disk.
         Returns:
             bool: True if the upload was successful, False otherwise.
         """
-        if not os.path.exists(filename):
+        if content is None and not os.path.exists(filename):
             logger.error(f"File {filename} does not exist")
             return False
 
+        def file_content():
+            return content if content is not None else open(filename, 'rb')
+
         if self.static_metadata:
             metadata.update({k: v for k, v in self.static_metadata.items() if k not in metadata})
 
@@ -653,7 +657,7 @@ class Indexer:
         upload_filename = id if id is not None else filename.split('/')[-1]
 
         files = {
-            'file': (upload_filename, open(filename, 'rb')),
+            'file': (upload_filename, file_content()),
             'metadata': (None, json.dumps(metadata), 'application/json'),
         }
 
@@ -674,7 +678,7 @@ class Indexer:
                     return False
                 self.delete_doc(doc_id)
                 new_files = {
-                    'file': (upload_filename, open(filename, 'rb')),
+                    'file': (upload_filename, file_content()),
                     'metadata': (None, json.dumps(metadata), 'application/json'),
                 }
                 if self.parse_tables and filename.endswith('.pdf'):
@@ -1048,6 +1052,65 @@ class Indexer:
 
         return self.index_document(document, use_core_indexing)
 
+    def index_bytes(self, content: bytes, filename: str, uri: str, metadata: Dict[str, Any], id: str = None) -> bool:
+        """
+        Index a file held in memory by uploading it to the Vectara corpus.
+
+        The content is uploaded directly when index_file() would use the file upload API without
+        reading the file locally; otherwise it is written to a temporary file and passed to index_file().
+
+        Args:
+            content (bytes): Content of the file.
+            filename (str): Name of the file, used for its extension and as the uploaded file name.
+            uri (str): URI for where the document originated.
+            metadata (dict): Metadata for the document.
+            id (str, optional): Document id for the uploaded document.
+
+        Returns:
+            bool: True if the upload was successful, False otherwise.
+        """
+        max_pdf_size = int(self.cfg.doc_processing.get('max_pdf_size', 50))
+        upload_directly = (
+            self._uses_file_upload_api(filename, uri) and
+            len(self.extract_metadata) == 0 and not self.summarize_images and not self.store_docs and
+            len(content) / (1024 * 1024) <= max_pdf_size
+        )
+        if upload_directly:
+            logger.info(f"For {uri} - Uploading via Vectara file upload API")
+            metadata['file_name'] = filename.split('/')[-1]
+            return self._index_file(filename, uri, metadata, id, content=content)
+
+        # keep the original file name, so index_file() sets the same metadata['file_name'] as the in-memory path
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, os.path.basename(filename))
+            with open(file_path, 'wb') as f:
+                f.write(content)
+            return self.index_file(file_path, uri, metadata, id)
+
+    def _uses_file_upload_api(self, filename: str, uri: str) -> bool:
+        """
+        Decide whether a file is indexed with the Vectara file upload API, rather than parsed locally.
+
+        Large document types that need contextual chunking, image summarization or gmft switch the
+        indexer to processing files locally from then on.
+
+        Args:
+            filename (str): Name of the file.
+            uri (str): URI for where the document originated.
+
+        Returns:
+            bool: True if the file upload API is used, False if the file is parsed locally.
+        """
+        large_file_extensions = ['.pdf', '.html', '.htm', '.pptx', '.docx']
+        if (any(uri.endswith(extension) for extension in large_file_extensions) and
+                (self.contextual_chunking or self.summarize_images or self.enable_gmft)
+        ):
+            self.process_locally = True
+
+        # Used when we don't need to process the file locally, and we don't need to parse tables from non-PDF files
+        return not self.process_locally and (
+                (self.parse_tables and filename.lower().endswith('.pdf')) or not self.parse_tables)
+
     def index_file(self, filename: str, uri: str, metadata: Dict[str, Any], id: str = None) -> bool:
         """
         Index a file on local file system by uploading it to the Vectara corpus.
@@ -1067,20 +1130,12 @@ class Indexer:
 
         # If we have a PDF/HTML/PPT/DOCX file with size>50MB, or we want to use the parse_tables option, then we parse locally and index
         max_chars = 128000  # all_text is limited to 128,000 characters
-        large_file_extensions = ['.pdf', '.html', '.htm', '.pptx', '.docx']
         filesize_mb = get_file_size_in_MB(filename)
 
-        if (any(uri.endswith(extension) for extension in large_file_extensions) and
-                (self.contextual_chunking or self.summarize_images or self.enable_gmft)
-        ):
-            self.process_locally = True
-
         #
         # Case A: using the file-upload API
-        # Used when we don't need to process the file locally, and we don't need to parse tables from non-PDF files
         #
-        if not self.process_locally and (
-                (self.parse_tables and filename.lower().endswith('.pdf')) or not self.parse_tables):
+        if self._uses_file_upload_api(filename, uri):
             logger.info(f"For {uri} - Uploading via Vectara file upload API")
             if len(self.extract_metadata) > 0 or self.summarize_images:
                 logger.info(f"Reading contents of {filename} (url={uri})")
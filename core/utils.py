@@ -50,6 +50,8 @@ spreadsheet_extensions={
 
 
 
+LOG_HANDLER_NAME = 'vectara-ingest'
+
 def setup_logging(level='INFO'):
     log_level_str = os.getenv("LOGGING_LEVEL", level).upper()
 
@@ -57,11 +59,16 @@ def setup_logging(level='INFO'):
     log_level = getattr(logging, log_level_str, logging.INFO)
     root = logging.getLogger()
     root.setLevel(log_level)
-    handler = logging.StreamHandler(sys.stdout)
+
+    # Install our handler only once per process; repeated calls (e.g. from every ray actor setup) just update the level
+    handler = next((h for h in root.handlers if h.get_name() == LOG_HANDLER_NAME), None)
+    if handler is None:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.set_name(LOG_HANDLER_NAME)
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
     handler.setLevel(log_level)
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    root.addHandler(handler)
 
     logger.debug("Setting logging levels")
     # Configure specific loggers based on environment variables
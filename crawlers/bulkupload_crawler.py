@@ -1,12 +1,15 @@
 import logging
 logger = logging.getLogger(__name__)
 from core.crawler import Crawler
-import json
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+import fastjsonschema
+import ijson
 import os
-from core.utils import get_docker_or_local_path
+from core.utils import get_docker_or_local_path, RateLimiter
 
-def is_valid(json_object):
-    return 'id' in json_object and 'sections' in json_object
+# compiled once into a specialized validation function
+validate_document = fastjsonschema.compile({'type': 'object', 'required': ['id', 'sections']})
 
 class BulkuploadCrawler(Crawler):
 
@@ -19,19 +22,47 @@ class BulkuploadCrawler(Crawler):
             config_path=config_path
         )
 
-        with open(json_file, 'r') as file:
-            data = file.read()
-        json_array = json.loads(data)
-        if not isinstance(json_array, list):
-            raise Exception("JSON file must contain an array of JSON objects")
+        num_threads = self.cfg.bulkupload_crawler.get("num_threads", 8)
+        num_per_second = self.cfg.bulkupload_crawler.get("num_per_second", None)
+        rate_limiter = RateLimiter(num_per_second) if num_per_second else nullcontext()
 
-        logger.info(f"indexing {len(json_array)} JSON documents from JSON file")
+        def index_document(json_object):
+            with rate_limiter:
+                return self.indexer.index_document(json_object)
+
+        # Stream the top-level array so only one document is held in memory at a time.
+        # use_float=True keeps numbers as float instead of Decimal so they remain JSON serializable.
+        # Up to num_threads documents are uploaded concurrently, and at most 2 * num_threads are held in memory.
+        logger.info(f"indexing JSON documents from {json_file}")
         count = 0
-        for json_object in json_array:
-            if count % 100 == 0:
-                logger.info(f"finished {count} documents so far")
-            if is_valid(json_object):
-                self.indexer.index_document(json_object)
+        finished = 0
+
+        def collect(done):
+            nonlocal finished
+            for future in done:
+                future.result()
+                finished += 1
+                if finished % 100 == 0:
+                    logger.info(f"finished {finished} documents so far")
+
+        with open(json_file, 'rb') as file, ThreadPoolExecutor(max_workers=num_threads) as executor:
+            # ijson.items() silently yields nothing for a non-array root, so check the first event explicitly
+            _, event, _ = next(ijson.parse(file))
+            if event != 'start_array':
+                raise Exception("JSON file must contain an array of JSON objects")
+            file.seek(0)
+
+            pending = set()
+            for json_object in ijson.items(file, 'item', use_float=True):
+                try:
+                    validate_document(json_object)
+                except fastjsonschema.JsonSchemaException:
+                    logger.warning(f"invalid JSON object: {json_object}")
+                    continue
+                pending.add(executor.submit(index_document, json_object))
                 count += 1
-            else:
-                logger.warning(f"invalid JSON object: {json_object}")
+                if len(pending) >= 2 * num_threads:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(wait(pending).done)
+        logger.info(f"finished indexing {count} documents from JSON file")
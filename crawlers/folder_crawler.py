@@ -3,9 +3,12 @@ import logging
 from core.dataframe_parser import supported_by_dataframe_parser, DataframeParser, load_dataframe_metadata, DataFrameMetadata
 
 logger = logging.getLogger(__name__)
+import itertools
 import os
-import pathlib
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import pandas as pd
 
 from slugify import slugify
@@ -19,6 +22,39 @@ from core.utils import RateLimiter, setup_logging, get_docker_or_local_path
 from core.summary import TableSummarizer
 from omegaconf import DictConfig
 
+_END_OF_FILES = object()
+_BATCH_SIZE = 32     # files sent to a ray actor per call
+_MEDIA_EXTS = frozenset({'.mp3', '.mp4'})
+_STAT_METADATA_FIELDS = ('created_at', 'last_updated', 'file_size')
+_DEFAULT_METADATA_FIELDS = _STAT_METADATA_FIELDS + ('source', 'title', 'parent_folder', 'folder_path')
+
+
+def _walk_parallel(root: str, executor: ThreadPoolExecutor):
+    """
+    Walk root like os.walk, but list directories concurrently on executor.
+    Yields (directory path, os.DirEntry) for every non-directory entry, as os.walk lists them in its files
+    (including broken symlinks); symlinked directories are listed as directories and not followed.
+    """
+    def list_dir(path):
+        try:
+            with os.scandir(path) as it:
+                return path, list(it)
+        except OSError as e:
+            logger.warning(f"Unable to list {path}: {e}")
+            return path, []
+
+    pending = {executor.submit(list_dir, root)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            path, entries = future.result()
+            for entry in entries:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        pending.add(executor.submit(list_dir, entry.path))
+                else:
+                    yield path, entry
+
 
 class FileCrawlWorker(object):
     def __init__(self, cfg:DictConfig, indexer: Indexer, crawler: Crawler, num_per_second: int):
@@ -26,22 +62,27 @@ class FileCrawlWorker(object):
         self.indexer = indexer
         self.rate_limiter = RateLimiter(num_per_second)
         self.cfg = cfg
+        self.df_parser = None
 
     def setup(self):
         self.indexer.setup()
         setup_logging()
 
-    def process(self, file_path: str, file_name: str, metadata: dict):
-        extension = pathlib.Path(file_path).suffix
+    def _get_df_parser(self) -> DataframeParser:
+        # built on first use and reused for every tabular file this worker handles
+        if self.df_parser is None:
+            table_summarizer:TableSummarizer = TableSummarizer(self.cfg, self.cfg.doc_processing.model_config.text)
+            self.df_parser = DataframeParser(self.cfg, None, self.indexer, table_summarizer)
+        return self.df_parser
+
+    def process(self, file_path: str, file_name: str, extension: str, metadata: dict):
         try:
-            if extension in ['.mp3', '.mp4']:
+            if extension in _MEDIA_EXTS:
                 self.indexer.index_media_file(file_path, metadata=metadata)
             elif supported_by_dataframe_parser(file_path):
                 logger.info(f"Indexing {file_path}")
-                table_summarizer:TableSummarizer = TableSummarizer(self.cfg, self.cfg.doc_processing.model_config.text)
-                df_parser:DataframeParser = DataframeParser(self.cfg, None, self.indexer, table_summarizer)
                 df_metadata:DataFrameMetadata = load_dataframe_metadata(file_path)
-                df_parser.parse(df_metadata, file_path, metadata)
+                self._get_df_parser().parse(df_metadata, file_path, metadata)
             else:
                 uri_to_use = file_name if 'url' not in metadata else metadata['url']
                 self.indexer.index_file(filename=file_path, uri=uri_to_use, metadata=metadata)
@@ -53,8 +94,85 @@ class FileCrawlWorker(object):
             return -1
         return 0
 
+    def process_batch(self, items: list) -> int:
+        """
+        Process a batch of (file_path, file_name, extension, metadata) tuples; returns the number of failed files.
+        """
+        return sum(self.process(*item) != 0 for item in items)
+
 class FolderCrawler(Crawler):
 
+    def _walk_files(self, folder: str, extensions: list, metadata_file: str, metadata: dict, source: str):
+        """
+        Walk the folder and yield a (file_path, file_name, extension, file_metadata) tuple for every file to index.
+        """
+        # extensions are matched case-insensitively, with or without a leading dot in the config
+        accept_all = "*" in extensions
+        extension_set = frozenset(e.lower() if e.startswith('.') else f".{e.lower()}" for e in extensions if e != "*")
+        # only stat the file if a metadata field needs it
+        metadata_fields = frozenset(self.cfg.folder_crawler.get("metadata_fields", _DEFAULT_METADATA_FIELDS))
+        needs_stat = not metadata_fields.isdisjoint(_STAT_METADATA_FIELDS)
+        with ThreadPoolExecutor() as executor:
+            for root, entry in _walk_parallel(folder, executor):
+                file = entry.name
+                # don't index the metadata file if it exists
+                if metadata_file and file.endswith(metadata_file):
+                    continue
+
+                file_extension = os.path.splitext(file)[1]
+                file_extension = file_extension.lower()
+                if accept_all or file_extension in extension_set:
+                    file_path = entry.path
+                    file_name = os.path.relpath(file_path, folder)
+                    rel_under_container = os.path.relpath(root, folder)
+                    full_folder_path = os.path.normpath(os.path.join(self.cfg.folder_crawler.path, rel_under_container))
+                    parent = os.path.basename(full_folder_path)
+                    file_metadata = {}
+                    if needs_stat:
+                        try:
+                            stat = entry.stat()
+                        except OSError as e:
+                            # e.g. the file was deleted after it was listed, or is a broken symlink
+                            logger.warning(f"Skipping {file_path}: {e}")
+                            continue
+                        file_metadata.update({
+                            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(stat.st_ctime)),
+                            'last_updated': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(stat.st_mtime)),
+                            'file_size': stat.st_size,
+                        })
+                    file_metadata.update({
+                        'source': source,
+                        'title': file_name,
+                        'parent_folder': parent,
+                        'folder_path': full_folder_path,
+                    })
+                    file_metadata = {k: v for k, v in file_metadata.items() if k in metadata_fields}
+                    if file_name in metadata:
+                        file_metadata.update(metadata.get(file_name, {}))
+                    yield (file_path, file_name, file_extension, file_metadata)
+
+    def _enumerate_files(self, out_queue: queue.Queue, walk_errors: list, *walk_args) -> None:
+        """
+        Producer thread: push files to process onto out_queue, followed by _END_OF_FILES.
+        An exception raised by the walk is appended to walk_errors, so crawl() can re-raise it.
+        """
+        try:
+            for tup in self._walk_files(*walk_args):
+                out_queue.put(tup)
+        except Exception as e:
+            logger.error(f"Error while listing files: {e}")
+            walk_errors.append(e)
+        finally:
+            out_queue.put(_END_OF_FILES)
+
+    @staticmethod
+    def _drain(in_queue: queue.Queue):
+        while True:
+            tup = in_queue.get()
+            if tup is _END_OF_FILES:
+                return
+            yield tup
+
     def crawl(self) -> None:
         docker_path = '/home/vectara/data'
         config_path = self.cfg.folder_crawler.path
@@ -72,56 +190,53 @@ class FolderCrawler(Crawler):
 
         if metadata_file:
             df = pd.read_csv(f"{folder}/{metadata_file}")
-            metadata = {row['filename'].strip(): row.drop('filename').to_dict() for _, row in df.iterrows()}
+            df['filename'] = df['filename'].str.strip()
+            # last row wins for duplicate filenames
+            metadata = df.drop_duplicates('filename', keep='last').set_index('filename').to_dict(orient='index')
         else:
             metadata = {}
         self.model = None
 
-        # Walk the directory and upload files with the specified extension to Vectara
-        logger.info(f"indexing files in {self.cfg.folder_crawler.path} with extensions {extensions}")
-        files_to_process = []
-        for root, _, files in os.walk(folder):
-            for file in files:
-                # don't index the metadata file if it exists
-                if metadata_file and file.endswith(metadata_file):
-                    continue
-
-                file_extension = pathlib.Path(file).suffix
-                if file_extension in extensions or "*" in extensions:
-                    file_path = os.path.join(root, file)
-                    file_name = os.path.relpath(file_path, folder)
-                    rel_under_container = os.path.relpath(root, folder)
-                    full_folder_path = os.path.normpath(os.path.join(self.cfg.folder_crawler.path, rel_under_container))
-                    parent = os.path.basename(full_folder_path)
-                    file_metadata = {
-                        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(os.path.getctime(file_path))),
-                        'last_updated': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(os.path.getmtime(file_path))),
-                        'file_size': os.path.getsize(file_path),
-                        'source': source,
-                        'title': file_name,
-                        'parent_folder': parent,
-                        'folder_path': full_folder_path,
-                    }
-                    if file_name in metadata:
-                        file_metadata.update(metadata.get(file_name, {}))
-                    files_to_process.append((file_path, file_name, file_metadata))
-
         if ray_workers == -1:
             ray_workers = psutil.cpu_count(logical=True)
 
+        # Walk the directory in a background thread, so indexing starts as soon as the first files are found
+        logger.info(f"indexing files in {self.cfg.folder_crawler.path} with extensions {extensions}")
+        files_queue = queue.Queue(maxsize=2 * _BATCH_SIZE * max(ray_workers, 1))
+        walk_errors = []
+        producer = threading.Thread(
+            target=self._enumerate_files,
+            args=(files_queue, walk_errors, folder, extensions, metadata_file, metadata, source),
+            daemon=True
+        )
+        producer.start()
+
         if ray_workers > 0:
             logger.info(f"Using {ray_workers} ray workers")
             self.indexer.p = self.indexer.browser = None
             ray.init(num_cpus=ray_workers, log_to_driver=True, include_dashboard=False)
-            actors = [ray.remote(FileCrawlWorker).remote(self.indexer, self, num_per_second) for _ in range(ray_workers)]
+            actors = [ray.remote(FileCrawlWorker).remote(self.cfg, self.indexer, self, num_per_second) for _ in range(ray_workers)]
             for a in actors:
                 a.setup.remote()
             pool = ray.util.ActorPool(actors)
-            _ = list(pool.map(lambda a, u: a.process.remote(u[0], u[1], u[2]), files_to_process))
+            files = self._drain(files_queue)
+            in_flight = 0
+            for batch in iter(lambda: list(itertools.islice(files, _BATCH_SIZE)), []):
+                pool.submit(lambda a, b: a.process_batch.remote(b), batch)
+                in_flight += 1
+                # keep at most two batches per actor outstanding, so the bounded queue throttles the walk
+                while in_flight >= 2 * ray_workers:
+                    pool.get_next_unordered()
+                    in_flight -= 1
+            while pool.has_next():
+                pool.get_next_unordered()
         else:
             crawl_worker = FileCrawlWorker(self.cfg, self.indexer, self, num_per_second)
-            for inx, tup in enumerate(files_to_process):
+            for inx, tup in enumerate(self._drain(files_queue)):
                 if inx % 100 == 0:
-                    logger.info(f"Crawling URL number {inx+1} out of {len(files_to_process)}")
-                file_path, file_name, file_metadata = tup
-                crawl_worker.process(file_path, file_name, file_metadata)
+                    logger.info(f"Crawling file number {inx+1}")
+                file_path, file_name, extension, file_metadata = tup
+                crawl_worker.process(file_path, file_name, extension, file_metadata)
+        producer.join()
+        if walk_errors:
+            raise walk_errors[0]
@@ -5,10 +5,20 @@ import time
 
 from office365.runtime.client_request_exception import ClientRequestException
 
+from office365.runtime.http.http_method import HttpMethod
+from office365.runtime.http.request_options import RequestOptions
 from office365.sharepoint.client_context import ClientContext
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from furl import furl
+import io
 import os
+from pathlib import Path
+import shutil
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from core.crawler import Crawler
 
 supported_extensions = {
@@ -17,6 +27,11 @@ supported_extensions = {
     ".rtf", ".epub"
 }
 
+# files larger than this are downloaded to a temporary file instead of memory
+max_in_memory_download_size = 64 * 1024 * 1024
+# total size of the downloads held in memory while they wait for indexing; further files go to temporary files
+max_in_memory_download_total = 256 * 1024 * 1024
+
 class SharepointCrawler(Crawler):
     """
     A crawler implementation for ingesting and indexing documents from SharePoint sites.
@@ -37,8 +52,7 @@ class SharepointCrawler(Crawler):
             furl.furl: A new furl object representing the resulting URL.
         """
         result = self.base_url.copy()
-        for p in paths:
-            result.path = os.path.join(str(result.path), str(p))
+        result.path = "/".join([str(result.path).rstrip("/")] + [str(p).strip("/") for p in paths])
         return result
 
     def download_url(self, file):
@@ -70,18 +84,43 @@ class SharepointCrawler(Crawler):
         self.base_url = furl(self.cfg.sharepoint_crawler.team_site_url)
         self.team_site_url = self.cfg.sharepoint_crawler.team_site_url
         logger.info(f"team_site_url = '{self.team_site_url}'")
+        # One pooled session shared by all client contexts, so connections are kept alive across requests and threads
+        self.http_session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32, pool_maxsize=64,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                              respect_retry_after_header=True, raise_on_status=False)
+        )
+        self.http_session.mount('https://', adapter)
+        self.http_session.mount('http://', adapter)
+        self.sharepoint_context = self.create_sharepoint_context()
+        self.thread_local = threading.local()
+        self.in_memory_lock = threading.Lock()
+        self.in_memory_bytes = 0
+
+    def create_sharepoint_context(self) -> ClientContext:
+        """
+        Creates a new authenticated SharePoint client context.
+
+        Returns:
+            ClientContext: A context authenticated with the configured auth_type.
+
+        Raises:
+            Exception: If an unsupported authentication type is specified in configuration.
+        """
         auth_type = self.cfg.sharepoint_crawler.get('auth_type', 'user_credentials')
         allow_ntlm = bool(self.cfg.sharepoint_crawler.get('allow_ntlm', 'True'))
         context = ClientContext(self.team_site_url, allow_ntlm=allow_ntlm)
+        self.use_http_session(context)
 
         match auth_type:
             case 'user_credentials':
-                self.sharepoint_context = context.with_user_credentials(
+                return context.with_user_credentials(
                     self.cfg.sharepoint_crawler.username,
                     self.cfg.sharepoint_crawler.password
                 )
             case 'client_credentials':
-                self.sharepoint_context = context.with_client_credentials(
+                return context.with_client_credentials(
                     self.cfg.sharepoint_crawler.client_id,
                     self.cfg.sharepoint_crawler.client_secret
                 )
@@ -93,24 +132,184 @@ class SharepointCrawler(Crawler):
                 }
                 if self.cfg.sharepoint_crawler.get('cert_passphrase'):
                     cert_settings['passphrase'] = self.cfg.sharepoint_crawler.cert_passphrase
-                self.sharepoint_context = context.with_client_certificate(
+                return context.with_client_certificate(
                     self.cfg.sharepoint_crawler.tenant_id, **cert_settings
                 )
             case _:
                 raise Exception(f"Unknown auth_type '{auth_type}'")
 
+    def use_http_session(self, context: ClientContext) -> None:
+        """
+        Routes the requests of a client context through the shared HTTP session.
+
+        office365 sends every request with the module level requests functions, which open a new
+        connection (and TLS handshake) each time.
+
+        Args:
+            context: The client context to configure.
+        """
+        client_request = context.pending_request()
+
+        def execute_request_direct(request: RequestOptions):
+            client_request.beforeExecute.notify(request)
+            body = {}
+            if request.method == HttpMethod.Patch or (
+                    request.method == HttpMethod.Post and not (request.is_bytes or request.is_file)):
+                body['json'] = request.data
+            elif request.method in (HttpMethod.Post, HttpMethod.Put):
+                body['data'] = request.data
+            response = self.http_session.request(
+                request.method, request.url, headers=request.headers, auth=request.auth,
+                verify=request.verify, stream=request.stream, proxies=request.proxies, **body
+            )
+            response.raise_for_status()
+            return response
+
+        client_request.execute_request_direct = execute_request_direct
+
+    def thread_sharepoint_context(self) -> ClientContext:
+        """
+        Returns the SharePoint client context owned by the calling thread, creating it on first use.
+
+        A ClientContext queues requests and executes its whole queue on execute_query(),
+        so it cannot be shared between download threads.
+
+        Returns:
+            ClientContext: The calling thread's client context.
+        """
+        context = getattr(self.thread_local, 'context', None)
+        if context is None:
+            context = self.create_sharepoint_context()
+            self.thread_local.context = context
+        return context
+
     def execute_with_retry(self, func):
+        """
+        Executes a SharePoint query, retrying on failure.
+
+        Args:
+            func: A callable returning the query to execute. It is called again for every attempt,
+                since a failed query is removed from the context's queue.
+
+        Returns:
+            The result of execute_query() for the successful attempt.
+        """
         retries = self.cfg.sharepoint_crawler.get("retry_attempts", 3)
         delay = self.cfg.sharepoint_crawler.get("retry_delay", 5)
         for attempt in range(retries):
             try:
-                return func.execute_query()
+                return func().execute_query()
             except Exception as e:
                 if attempt == retries - 1:
                     raise
                 logger.warning(f"Attempt {attempt + 1} failed with error: {e}. Retrying in {delay} seconds...")
                 time.sleep(delay)
 
+    def reserve_in_memory(self, size: int) -> bool:
+        """
+        Reserves room for an in-memory download of size bytes.
+
+        Returns:
+            bool: True if the file fits under max_in_memory_download_size and max_in_memory_download_total,
+                in which case release_in_memory(size) must be called once its content is no longer held.
+        """
+        if size > max_in_memory_download_size:
+            return False
+        with self.in_memory_lock:
+            if self.in_memory_bytes + size > max_in_memory_download_total:
+                return False
+            self.in_memory_bytes += size
+            return True
+
+    def release_in_memory(self, size: int) -> None:
+        """
+        Releases room reserved by reserve_in_memory(size).
+        """
+        with self.in_memory_lock:
+            self.in_memory_bytes -= size
+
+    def download_file(self, file):
+        """
+        Downloads a SharePoint file using the calling thread's client context.
+
+        Files are kept in memory while they fit the budget of reserve_in_memory(); other files are written under
+        their own name to a new temporary directory.
+
+        Args:
+            file: A SharePoint file object.
+
+        Returns:
+            tuple: The file object and either the file content (bytes), the path of the downloaded file (str),
+                or None if the download failed.
+        """
+        context = self.thread_sharepoint_context()
+        in_memory = file.properties.get("Length") is not None and self.reserve_in_memory(file.length)
+        if in_memory:
+            out = io.BytesIO()
+        else:
+            # keep the original file name, so indexing sets the same metadata['file_name'] as the in-memory path
+            out = open(os.path.join(tempfile.mkdtemp(), file.name), "wb")
+
+        def download():
+            out.seek(0)
+            out.truncate()
+            remote_file = context.web.get_file_by_server_relative_url(file.serverRelativeUrl)
+            # Reuse the properties loaded by get_files(), so download_session() does not issue a request to read
+            # them again; the entity reference ("Id") is the file's UniqueId.
+            for name, value in file.properties.items():
+                remote_file.set_property(name, value, persist_changes=False)
+            if not remote_file.is_property_available(remote_file.property_ref_name):
+                remote_file.set_property(remote_file.property_ref_name, file.unique_id, persist_changes=False)
+            return remote_file.download_session(out, use_path=False)
+
+        logger.debug(f"Downloading content for {file.unique_id}")
+        try:
+            self.execute_with_retry(download)
+        except Exception as e:
+            logger.error(f"Error downloading {file.unique_id} - {file.serverRelativeUrl}: {e}")
+            if in_memory:
+                self.release_in_memory(file.length)
+            else:
+                out.close()
+                shutil.rmtree(os.path.dirname(out.name), ignore_errors=True)
+            return file, None
+
+        if in_memory:
+            return file, out.getvalue()
+        out.close()
+        logger.debug(f"Wrote {os.path.getsize(out.name)} to {out.name}")
+        return file, out.name
+
+    def index_downloaded_file(self, file, downloaded, cleanup_temp_files: bool) -> None:
+        """
+        Indexes a file downloaded by download_file(), removing its temporary directory if there is one.
+
+        Args:
+            file: The SharePoint file object.
+            downloaded: The file content (bytes), the path of the downloaded file (str), or None if the download failed.
+            cleanup_temp_files: Whether to delete the temporary file after indexing.
+        """
+        if downloaded is None:
+            return
+        metadata = {'url': self.download_url(file)}
+        if isinstance(downloaded, bytes):
+            try:
+                succeeded = self.indexer.index_bytes(downloaded, file.name, metadata['url'], metadata, file.unique_id)
+            finally:
+                self.release_in_memory(file.length)
+        else:
+            try:
+                succeeded = self.indexer.index_file(downloaded, metadata['url'], metadata, file.unique_id)
+            finally:
+                if cleanup_temp_files:
+                    logger.debug(f"Cleaning up temp file: {downloaded}")
+                    shutil.rmtree(os.path.dirname(downloaded), ignore_errors=True)
+                else:
+                    logger.warning(f"Skipping clean up of temp file: {downloaded}")
+
+        if not succeeded:
+            logger.error(f"Error indexing {file.unique_id} - {file.serverRelativeUrl}")
+
     def crawl_folder(self) -> None:
         """
         Crawls a specified SharePoint folder to locate, download, and index files.
@@ -140,36 +339,30 @@ class SharepointCrawler(Crawler):
         files = root_folder.get_files(recursive=recursive).execute_query()
         count = len(files)
         logger.info(f"Found {count} files in {root_folder.name}.")
-        for file in files:
-            logger.info(f"Processing {file}")
-            filename, file_extension = os.path.splitext(file.name)
-            if file_extension.lower() == ".zip":
-                metadata = {'url': self.download_url(file)}
-                self.extract_and_upload_zip(file.server_relative_url, metadata, file.unique_id)
-            elif file_extension.lower() not in supported_extensions:
-                logger.warning(f"Skipping {file} due to unsupported file type '{file_extension}'.")
-            else:
-                metadata = {'url': self.download_url(file)}
-                logger.info(f"Downloading {file}")
-                with tempfile.NamedTemporaryFile(suffix=file_extension, mode="wb", delete=False) as f:
-                    logger.debug(f"Downloading and writing content for {file.unique_id} to {f.name}")
-                    file.download_session(f).execute_query()
-                    f.flush()
-                    f.close()
-                    logger.debug(f"Wrote {os.path.getsize(f.name)} to {f.name}")
-
-                    try:
-                        succeeded = self.indexer.index_file(f.name, metadata['url'], metadata, file.unique_id)
-                    finally:
-                        if cleanup_temp_files:
-                            logger.debug(f"Cleaning up temp file: {f.name}")
-                            if os.path.exists(f.name):
-                                os.remove(f.name)
-                        else:
-                            logger.warning(f"Skipping clean up of temp file: {f.name}")
-
-                    if not succeeded:
-                        logger.error(f"Error indexing {file.unique_id} - {file.serverRelativeUrl}")
+        # Downloads run in a thread pool; indexing stays on this thread as it completes.
+        # At most 2 * download_workers downloaded files wait for indexing at any time, in memory up to
+        # max_in_memory_download_total and in temporary files beyond that.
+        download_workers = self.cfg.sharepoint_crawler.get('download_workers', 16)
+        with ThreadPoolExecutor(max_workers=download_workers) as executor:
+            pending = set()
+            for file in files:
+                logger.info(f"Processing {file}")
+                filename, file_extension = os.path.splitext(file.name)
+                if file_extension.lower() == ".zip":
+                    metadata = {'url': self.download_url(file)}
+                    self.extract_and_upload_zip(file.serverRelativeUrl, metadata, file.unique_id)
+                elif file_extension.lower() not in supported_extensions:
+                    logger.warning(f"Skipping {file} due to unsupported file type '{file_extension}'.")
+                else:
+                    logger.info(f"Downloading {file}")
+                    pending.add(executor.submit(self.download_file, file))
+                    if len(pending) >= 2 * download_workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self.index_downloaded_file(*future.result(), cleanup_temp_files)
+
+            for future in as_completed(pending):
+                self.index_downloaded_file(*future.result(), cleanup_temp_files)
 
     def crawl(self) -> None:
         """
@@ -201,18 +394,27 @@ class SharepointCrawler(Crawler):
         list_name = self.cfg.sharepoint_crawler.target_list
         target_list = self.sharepoint_context.web.lists.get_by_title(list_name)
         self.sharepoint_context.load(target_list, ['Id'])
-        items = target_list.items.get().execute_query()
 
         load_properties = ["Attachments", "ID"]
         allowed_properties = self.cfg.sharepoint_crawler.get("list_item_metadata_properties", [])
         for p in allowed_properties:
             load_properties.append(p)
 
-        logger.debug(f"Loading properties: {', '.join(load_properties)}")
-        self.sharepoint_context.load(items, load_properties)
-        self.sharepoint_context.execute_query()
+        # Load every item in pages of up to 5000 (the SharePoint list view threshold).
+        # Without list_item_metadata_properties all properties are loaded, so they can be logged below.
+        items = target_list.items
+        if len(allowed_properties) > 0:
+            logger.debug(f"Loading properties: {', '.join(load_properties)}")
+            items = items.select(load_properties)
+        items.get_all(page_size=5000).execute_query()
+
+        # Load the attachment collections of all items in OData $batch requests instead of one request per item.
+        items_with_attachments = [item for item in items if item.properties.get('Attachments')]
+        for item in items_with_attachments:
+            self.sharepoint_context.load(item.attachment_files)
+        self.sharepoint_context.execute_batch(items_per_batch=50)
+        logger.info(f"Found {len(items)} items in list '{list_name}', {len(items_with_attachments)} with attachments")
 
-        allowed_properties = self.cfg.sharepoint_crawler.get("list_item_metadata_properties", [])
         all_properties = None
         for item in items:
             if len(allowed_properties) == 0:
@@ -227,11 +429,8 @@ class SharepointCrawler(Crawler):
             item_id = item.properties["ID"]
             metadata["list_id"] = str(target_list.id)
             metadata["list_item_id"] = str(item_id)
-            if 'Attachments' in item.properties:
-                attachment_files = item.attachment_files
-                self.sharepoint_context.load(attachment_files)
-                self.sharepoint_context.execute_query()
-                for attachment in attachment_files:
+            if item.properties.get('Attachments'):
+                for attachment in item.attachment_files:
                     filename = os.path.basename(attachment.server_relative_url)
                     filename, file_extension = os.path.splitext(filename)
                     if file_extension.lower() == ".zip":
@@ -244,24 +443,22 @@ class SharepointCrawler(Crawler):
                         attachment_url = attachment.resource_url
                         metadata["url"] = attachment_url
 
-                        with tempfile.NamedTemporaryFile(suffix=file_extension, mode="wb", delete=False) as f:
-                            logger.info(f"Item Id {item_id}: Downloading {attachment_url}")
-                            logger.debug(f"Item Id {item_id}: Calling sharepoint_context.web.get_file_by_server_relative_url('{attachment.server_relative_url}')")
-                            attachment_file = self.sharepoint_context.web.get_file_by_server_relative_url(attachment.server_relative_url)
-                            logger.debug(f"attachment_file = {attachment_file}. Calling download...")
-
-                            try:
-                                attachment_file.download(f).execute_query()
-                                succeeded = self.indexer.index_file(f.name, attachment_url, metadata, doc_id)
-                            except ClientRequestException as e:
-                                logger.error(f"ClientRequestException when downloading {attachment.server_relative_url}: {e}")
-                                continue
-                            finally:
-                                if os.path.exists(f.name):
-                                    os.remove(f.name)
+                        # File.download() reads the whole response body anyway, so keep it in memory
+                        buffer = io.BytesIO()
+                        logger.info(f"Item Id {item_id}: Downloading {attachment_url}")
+                        logger.debug(f"Item Id {item_id}: Calling sharepoint_context.web.get_file_by_server_relative_url('{attachment.server_relative_url}')")
+                        attachment_file = self.sharepoint_context.web.get_file_by_server_relative_url(attachment.server_relative_url)
+                        logger.debug(f"attachment_file = {attachment_file}. Calling download...")
 
-                            if not succeeded:
-                                logger.error(f"Error indexing attachment {filename} for list item {item_id}")
+                        try:
+                            attachment_file.download(buffer).execute_query()
+                            succeeded = self.indexer.index_bytes(buffer.getvalue(), f"{filename}{file_extension}", attachment_url, metadata, doc_id)
+                        except ClientRequestException as e:
+                            logger.error(f"ClientRequestException when downloading {attachment.server_relative_url}: {e}")
+                            continue
+
+                        if not succeeded:
+                            logger.error(f"Error indexing attachment {filename} for list item {item_id}")
 
     def extract_and_upload_zip(self, zip_url: str, metadata: dict, doc_id_prefix: str) -> None:
         if not zip_url:
@@ -272,8 +469,12 @@ class SharepointCrawler(Crawler):
         try:
             with tempfile.NamedTemporaryFile(suffix=".zip", mode="wb", delete=False) as tmp_zip:
                 logger.info(f"Downloading ZIP file from {zip_url}")
-                file_obj = self.sharepoint_context.web.get_file_by_server_relative_url(zip_url).download(tmp_zip)
-                self.execute_with_retry(file_obj)
+                def download():
+                    tmp_zip.seek(0)
+                    tmp_zip.truncate()
+                    return self.sharepoint_context.web.get_file_by_server_relative_url(zip_url).download(tmp_zip)
+
+                self.execute_with_retry(download)
                 tmp_zip_path = tmp_zip.name
 
             with tempfile.TemporaryDirectory() as extract_dir:
@@ -297,5 +498,5 @@ class SharepointCrawler(Crawler):
                         except Exception as e:
                             logger.error(f"Error indexing file {relative_path} from ZIP: {e}")
         finally:
-            if tmp_zip_path and os.path.exists(tmp_zip_path):
-                os.remove(tmp_zip_path)
\ No newline at end of file
+            if tmp_zip_path:
+                Path(tmp_zip_path).unlink(missing_ok=True)
\ No newline at end of file
@@ -1,22 +1,33 @@
 import logging
 logger = logging.getLogger(__name__)
-import markdown
+from markdown_it import MarkdownIt
+from mdit_plain.renderer import RendererPlain
 from core.crawler import Crawler
-from core.utils import html_to_text
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 import synapseclient
+from omegaconf import OmegaConf
+
+PROGRAM_URL = 'https://adknowledgeportal.synapse.org/Explore/Programs/DetailsPage?Program='
+STUDY_URL = 'https://adknowledgeportal.synapse.org/Explore/Studies/DetailsPage/StudyDetails?Study='
 
 class SynapseCrawler(Crawler):
 
-    def _index_wiki_content(self, syn: str, wiki_id: str, description: str, url: str, source: str, wiki_type: str = "study") -> None:
+    def __init__(self, cfg: OmegaConf, endpoint: str, corpus_key: str, api_key: str) -> None:
+        super().__init__(cfg, endpoint, corpus_key, api_key)
+        # renders wiki markdown straight to plain text, without an HTML intermediate
+        self.md = MarkdownIt(renderer_cls=RendererPlain)
+
+    def _fetch_wiki(self, syn: synapseclient.Synapse, wiki_id: str) -> dict:
         try:
-            wiki_dict = syn.getWiki(wiki_id)
+            return syn.getWiki(wiki_id)
         except Exception as e:
             logger.info(f"Error getting wiki {wiki_id}: {e}")
-            return
+            return None
 
-        study_text = html_to_text(markdown.markdown(wiki_dict['markdown']))
+    def _index_wiki_content(self, wiki_id: str, wiki_dict: dict, description: str, url: str, source: str, wiki_type: str = "study") -> None:
+        study_text = self.md.render(wiki_dict['markdown'])
         doc = {
             "id": wiki_id,
             "metadata": {
@@ -55,7 +66,7 @@ class SynapseCrawler(Crawler):
         df.columns = ['program', 'description']
         for tup in df.itertuples(index=False):
             logger.info(f"Indexing program {tup.program}")
-            url = f'https://adknowledgeportal.synapse.org/Explore/Programs/DetailsPage?Program={tup.program}'
+            url = f'{PROGRAM_URL}{tup.program}'
             doc = {
                 "id": tup.program,
                 "title": f'Program {tup.program}',
@@ -77,18 +88,27 @@ class SynapseCrawler(Crawler):
         df = syn.tableQuery(f"SELECT * from {studies_id};", resultsAs="rowset").asDataFrame()
         df = df[['Program', 'Study', 'Study_Description', 'Methods']]
         df.columns = ['program', 'study', 'description', 'methods']
+        wikis = []     # (wiki_id, description, url, wiki_type)
         for tup in df.itertuples(index=False):
-            logger.info(f"Indexing study {tup.study}")
-            url = f'https://adknowledgeportal.synapse.org/Explore/Studies/DetailsPage/StudyDetails?Study={tup.study}'
-            self._index_wiki_content(syn, tup.study, tup.description, url, source, wiki_type="study")
+            url = f'{STUDY_URL}{tup.study}'
+            wikis.append((tup.study, tup.description, url, "study"))
 
             if tup.methods is None:
                 continue
             methods = [m.strip() for m in tup.methods.split(',')]
             logger.info(f"For study {tup.study}, we have {len(methods)} methods to index")
-            url = f'https://adknowledgeportal.synapse.org/Explore/Studies/DetailsPage/StudyDetails?Study={tup.study}#Methods'
+            url = f'{STUDY_URL}{tup.study}#Methods'
             for method in methods:
-                logger.info(f"Indexing method {method}")
-                self._index_wiki_content(syn, method, f"Study {tup.study}, Method {method}", url, source, wiki_type="method")
+                wikis.append((method, f"Study {tup.study}, Method {method}", url, "method"))
+
+        # Fetch wikis concurrently; indexing stays on this thread
+        num_threads = self.cfg.synapse_crawler.get("num_threads", 8)
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            wiki_dicts = executor.map(lambda w: self._fetch_wiki(syn, w[0]), wikis)
+            for (wiki_id, description, url, wiki_type), wiki_dict in zip(wikis, wiki_dicts):
+                if wiki_dict is None:
+                    continue
+                logger.info(f"Indexing {wiki_type} {wiki_id}")
+                self._index_wiki_content(wiki_id, wiki_dict, description, url, source, wiki_type=wiki_type)
 
         logger.info(f"Finished indexing all studies (total={len(df)})")
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from omegaconf import OmegaConf
+
+from crawlers.folder_crawler import FolderCrawler, _walk_parallel
+
+
+class TestFolderCrawler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, 'a', 'b', 'c'))
+        os.makedirs(os.path.join(self.root, 'outside'))
+        for path in ['top.txt', 'x.PDF', os.path.join('a', 'one.pdf'), os.path.join('a', 'b', 'two.md'),
+                     os.path.join('a', 'b', 'c', 'three.html'), os.path.join('outside', 'hidden.txt')]:
+            with open(os.path.join(self.root, path), 'w') as f:
+                f.write('content')
+        os.symlink(os.path.join(self.root, 'outside'), os.path.join(self.root, 'a', 'linked_dir'))
+        os.symlink(os.path.join(self.root, 'top.txt'), os.path.join(self.root, 'a', 'linked_file.txt'))
+        os.symlink(os.path.join(self.root, 'missing.txt'), os.path.join(self.root, 'a', 'broken.txt'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _crawler(self, **folder_crawler_cfg):
+        crawler = FolderCrawler.__new__(FolderCrawler)
+        crawler.cfg = OmegaConf.create({'folder_crawler': {'path': self.root, **folder_crawler_cfg}})
+        return crawler
+
+    def test_walk_parallel_matches_os_walk(self):
+        expected = sorted(os.path.join(root, name) for root, _, files in os.walk(self.root) for name in files)
+        with ThreadPoolExecutor() as executor:
+            actual = sorted(entry.path for _, entry in _walk_parallel(self.root, executor))
+        self.assertEqual(expected, actual)
+        self.assertIn(os.path.join(self.root, 'a', 'broken.txt'), actual)
+        self.assertNotIn(os.path.join(self.root, 'a', 'linked_dir', 'hidden.txt'), actual)
+
+    def test_extensions_match_case_insensitively_with_or_without_dot(self):
+        for extension in ['PDF', '.pdf']:
+            crawler = self._crawler()
+            names = sorted(name for _, name, _, _ in crawler._walk_files(self.root, [extension], None, {}, 'folder'))
+            self.assertEqual([os.path.join('a', 'one.pdf'), 'x.PDF'], names)
+
+    def test_metadata_fields_skip_stat(self):
+        crawler = self._crawler(metadata_fields=['source'])
+        results = {name: metadata for _, name, _, metadata in crawler._walk_files(self.root, ['*'], None, {}, 'folder')}
+        # the broken symlink is not skipped, since no stat-derived field is requested
+        self.assertIn(os.path.join('a', 'broken.txt'), results)
+        for metadata in results.values():
+            self.assertEqual({'source': 'folder'}, metadata)
+
+    def test_stat_fields_skip_broken_symlinks(self):
+        crawler = self._crawler()
+        results = {name: metadata for _, name, _, metadata in crawler._walk_files(self.root, ['*'], None, {}, 'folder')}
+        self.assertNotIn(os.path.join('a', 'broken.txt'), results)
+        self.assertEqual(len('content'), results['top.txt']['file_size'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import threading
+import unittest
+
+from furl import furl
+
+from crawlers.sharepoint_crawler import SharepointCrawler, max_in_memory_download_size, max_in_memory_download_total
+
+
+class TestSharepointCrawler(unittest.TestCase):
+    def _crawler(self, team_site_url: str) -> SharepointCrawler:
+        crawler = SharepointCrawler.__new__(SharepointCrawler)
+        crawler.base_url = furl(team_site_url)
+        return crawler
+
+    def test_new_url_base_without_path(self):
+        crawler = self._crawler('https://tenant.sharepoint.com')
+        self.assertEqual('https://tenant.sharepoint.com/_layouts/15/download.aspx',
+                         crawler.new_url('_layouts/15/download.aspx').url)
+
+    def test_new_url_base_with_trailing_slash(self):
+        crawler = self._crawler('https://tenant.sharepoint.com/sites/team/')
+        self.assertEqual('https://tenant.sharepoint.com/sites/team/_layouts/15/download.aspx',
+                         crawler.new_url('_layouts/15/download.aspx').url)
+
+    def test_new_url_nested_site(self):
+        crawler = self._crawler('https://tenant.sharepoint.com/sites/team/subsite')
+        self.assertEqual('https://tenant.sharepoint.com/sites/team/subsite/_layouts/15/download.aspx',
+                         crawler.new_url('/_layouts/15/', 'download.aspx').url)
+
+    def test_new_url_does_not_modify_base_url(self):
+        crawler = self._crawler('https://tenant.sharepoint.com/sites/team')
+        crawler.new_url('_layouts/15/download.aspx')
+        self.assertEqual('https://tenant.sharepoint.com/sites/team', crawler.base_url.url)
+
+    def test_in_memory_downloads_share_a_total_budget(self):
+        crawler = self._crawler('https://tenant.sharepoint.com')
+        crawler.in_memory_lock = threading.Lock()
+        crawler.in_memory_bytes = 0
+        self.assertFalse(crawler.reserve_in_memory(max_in_memory_download_size + 1))
+        reserved = 0
+        while crawler.reserve_in_memory(max_in_memory_download_size):
+            reserved += max_in_memory_download_size
+        self.assertEqual(max_in_memory_download_total - max_in_memory_download_total % max_in_memory_download_size,
+                         reserved)
+        crawler.release_in_memory(max_in_memory_download_size)
+        self.assertTrue(crawler.reserve_in_memory(max_in_memory_download_size))
+
+
+if __name__ == '__main__':
+    unittest.main()
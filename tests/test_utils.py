@@ -1,7 +1,8 @@
+import logging
 import unittest
 import tempfile
 
-from core.utils import get_file_size_in_MB
+from core.utils import get_file_size_in_MB, setup_logging, LOG_HANDLER_NAME
 class TestUtils(unittest.TestCase):
     def test_get_file_size_in_MB(self):
         file_size=2 * 1024 * 1024
@@ -16,4 +17,13 @@ class TestUtils(unittest.TestCase):
         with tempfile.TemporaryFile() as fp:
             fp.flush()
             actual = get_file_size_in_MB(fp.name)
-            self.assertEqual(0, actual)
\ No newline at end of file
+            self.assertEqual(0, actual)
+
+    def test_setup_logging_is_idempotent(self):
+        root = logging.getLogger()
+        self.addCleanup(root.setLevel, root.level)
+        self.addCleanup(setattr, root, 'handlers', list(root.handlers))
+        setup_logging()
+        setup_logging('DEBUG')
+        handlers = [h for h in logging.getLogger().handlers if h.get_name() == LOG_HANDLER_NAME]
+        self.assertEqual(1, len(handlers))